@@ -0,0 +1,383 @@
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient
+
+# Benchmark harness for the API in main.py.
+#
+# Seeds a MongoDB database (dropped and recreated on every run) with users, instructors and
+# sessions, then drives the routes at a fixed concurrency either in-process through ASGI or
+# against a running server (--url), and writes throughput and p50/p95/p99 latency per
+# endpoint as JSON so runs can be compared. Needs httpx on top of the app's own packages:
+#
+#   pip install httpx
+#
+#   python bench.py --users 10000 --instructors 500 --sessions 200000 --output before.json
+#   DB_NAME=collections_bench uvicorn main:app & python bench.py --url http://127.0.0.1:8000
+
+SCENARIOS = ("list_all", "point_lookups", "create_session", "mixed", "crud")
+SEED_CHUNK_SIZE = 10000
+FIRST_DATE = datetime(2024, 1, 1)
+
+
+async def seed(db, users, instructors, sessions, rng):
+    for name in ("users", "instructors", "sessions", "propagation_outbox"):
+        await db.drop_collection(name)
+
+    user_docs = [{"id": i, "username": f"user{i}", "level": rng.choice(["beginner", "intermediate", "advanced"])}
+                 for i in range(1, users + 1)]
+    instructor_docs = [{"id": i, "name": f"instructor{i}", "role": "teacher", "model_version": None,
+                        "expertise": rng.choice(["math", "physics", "history"])}
+                       for i in range(1, instructors + 1)]
+    for collection, docs in (("users", user_docs), ("instructors", instructor_docs)):
+        for start in range(0, len(docs), SEED_CHUNK_SIZE):
+            await db[collection].insert_many([dict(d) for d in docs[start:start + SEED_CHUNK_SIZE]])
+
+    chunk = []
+    for i in range(1, sessions + 1):
+        user = user_docs[rng.randrange(users)]
+        instructor = instructor_docs[rng.randrange(instructors)]
+        chunk.append({
+            "id": i,
+            "topic": f"topic{i % 100}",
+            "date": FIRST_DATE + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+            "instructor_id": instructor["id"],
+            "user_id": user["id"],
+            "user": dict(user),
+            "instructor": dict(instructor),
+        })
+        if len(chunk) >= SEED_CHUNK_SIZE:
+            await db["sessions"].insert_many(chunk)
+            chunk = []
+    if chunk:
+        await db["sessions"].insert_many(chunk)
+
+
+# Each operation returns (endpoint label, coroutine performing the request)
+class Operations:
+    def __init__(self, args, rng, new_ids=None):
+        self.args = args
+        self.rng = rng
+        if new_ids is None:
+            new_ids = itertools.count(max(args.users, args.instructors, args.sessions) + 1)
+        self.new_ids = new_ids
+
+    # Same id counter, separate random stream: each worker draws its own reproducible sequence
+    def for_worker(self, n):
+        return Operations(self.args, random.Random(self.args.seed + n), self.new_ids)
+
+    def user_id(self):
+        return self.rng.randint(1, self.args.users)
+
+    def instructor_id(self):
+        return self.rng.randint(1, self.args.instructors)
+
+    def session_id(self):
+        return self.rng.randint(1, self.args.sessions)
+
+    def user_body(self, user_id):
+        return {"id": user_id, "username": f"user{user_id}", "level": self.rng.choice(["beginner", "advanced"])}
+
+    def instructor_body(self, instructor_id):
+        return {"id": instructor_id, "name": f"instructor{instructor_id}", "role": "teacher",
+                "expertise": self.rng.choice(["math", "physics", "history"])}
+
+    def session_body(self, session_id):
+        date = FIRST_DATE + timedelta(minutes=self.rng.randrange(365 * 24 * 60))
+        return {"id": session_id, "topic": "benchmark", "date": date.isoformat(),
+                "instructor_id": self.instructor_id(), "user_id": self.user_id()}
+
+    # list_all
+    def stream_sessions(self, http):
+        return "GET /sessions?stream", http.get("/sessions", params={"stream": "true"})
+
+    def stream_users(self, http):
+        return "GET /users?stream", http.get("/users", params={"stream": "true"})
+
+    def page_sessions(self, http):
+        after = self.rng.randint(0, max(self.args.sessions - 1000, 0))
+        return "GET /sessions?after", http.get("/sessions", params={"after": after, "limit": 1000})
+
+    def stream_instructors(self, http):
+        return "GET /instructors?stream", http.get("/instructors", params={"stream": "true"})
+
+    def page_instructors(self, http):
+        return "GET /instructors", http.get("/instructors", params={"limit": 1000})
+
+    # point lookups and queries
+    def get_user(self, http):
+        return "GET /users/{user_id}", http.get(f"/users/{self.user_id()}")
+
+    def get_instructor(self, http):
+        return "GET /instructors/{instructor_id}", http.get(f"/instructors/{self.instructor_id()}")
+
+    def get_session(self, http):
+        return "GET /sessions/{session_id}", http.get(f"/sessions/{self.session_id()}")
+
+    def sessions_for_user(self, http):
+        month = self.rng.randint(1, 11)
+        params = {"user_id": self.user_id(), "from": f"2024-{month:02d}-01", "to": f"2024-{month + 1:02d}-01"}
+        return "GET /sessions?user_id&from&to", http.get("/sessions", params=params)
+
+    def stats_by_instructor(self, http):
+        return "GET /sessions/stats/by-instructor", http.get("/sessions/stats/by-instructor")
+
+    def stats_by_day(self, http):
+        params = {"instructor_id": self.instructor_id()}
+        return "GET /sessions/stats/by-day", http.get("/sessions/stats/by-day", params=params)
+
+    # writes
+    def create_session(self, http):
+        return "POST /sessions", http.post("/sessions", json=self.session_body(next(self.new_ids)))
+
+    def update_user(self, http):
+        user_id = self.user_id()
+        return "PUT /users/{user_id}", http.put(f"/users/{user_id}", json=self.user_body(user_id))
+
+    def update_instructor(self, http):
+        instructor_id = self.instructor_id()
+        return ("PUT /instructors/{instructor_id}",
+                http.put(f"/instructors/{instructor_id}", json=self.instructor_body(instructor_id)))
+
+    def update_session(self, http):
+        session_id = self.session_id()
+        return "PUT /sessions/{session_id}", http.put(f"/sessions/{session_id}", json=self.session_body(session_id))
+
+    # Full create / read / update / delete cycle on fresh ids, touching every remaining route
+    async def crud_cycle(self, http, record):
+        new_id = next(self.new_ids)
+        await record("GET /", http.get("/"))
+        await record("POST /users", http.post("/users", json=self.user_body(new_id)))
+        await record("POST /instructors", http.post("/instructors", json=self.instructor_body(new_id)))
+        session = {**self.session_body(new_id), "user_id": new_id, "instructor_id": new_id}
+        await record("POST /sessions", http.post("/sessions", json=session))
+        await record("GET /users", http.get("/users", params={"after": new_id - 1, "limit": 10}))
+        await record("GET /instructors", http.get("/instructors", params={"after": new_id - 1, "limit": 10}))
+        await record("GET /sessions", http.get("/sessions", params={"after": new_id - 1, "limit": 10}))
+        await record("GET /users/{user_id}", http.get(f"/users/{new_id}"))
+        await record("GET /instructors/{instructor_id}", http.get(f"/instructors/{new_id}"))
+        await record("GET /sessions/{session_id}", http.get(f"/sessions/{new_id}"))
+        await record("PUT /users/{user_id}", http.put(f"/users/{new_id}", json=self.user_body(new_id)))
+        await record("PUT /instructors/{instructor_id}",
+                     http.put(f"/instructors/{new_id}", json=self.instructor_body(new_id)))
+        await record("PUT /sessions/{session_id}", http.put(f"/sessions/{new_id}", json=session))
+        await record("DELETE /sessions/{session_id}", http.delete(f"/sessions/{new_id}"))
+        await record("DELETE /users/{user_id}", http.delete(f"/users/{new_id}"))
+        await record("DELETE /instructors/{instructor_id}", http.delete(f"/instructors/{new_id}"))
+
+        bulk_ids = [next(self.new_ids) for _ in range(self.args.bulk_size)]
+        ndjson = "\n".join(json.dumps(self.user_body(i)) for i in bulk_ids)
+        await record("POST /users/bulk", http.post("/users/bulk", content=ndjson,
+                                                   headers={"content-type": "application/x-ndjson"}))
+        await record("POST /instructors/bulk",
+                     http.post("/instructors/bulk", json=[self.instructor_body(i) for i in bulk_ids]))
+        await record("POST /sessions/bulk", http.post("/sessions/bulk", json=[self.session_body(i) for i in bulk_ids]))
+        await record("GET /cache/stats", http.get("/cache/stats"))
+        await record("GET /metrics", http.get("/metrics"))
+        await record("GET /metrics/slow-queries", http.get("/metrics/slow-queries"))
+
+    def mix(self, scenario):
+        # (weight, operation) pairs for the weighted scenarios
+        if scenario == "list_all":
+            return [
+                (1, self.stream_sessions), (1, self.stream_users), (1, self.stream_instructors),
+                (4, self.page_sessions), (4, self.page_instructors),
+            ]
+        if scenario == "point_lookups":
+            return [(1, self.get_user), (1, self.get_instructor), (1, self.get_session)]
+        if scenario == "create_session":
+            return [(1, self.create_session)]
+        if scenario == "mixed":
+            return [
+                (25, self.get_session), (15, self.get_user), (15, self.get_instructor),
+                (15, self.sessions_for_user), (5, self.stats_by_instructor), (5, self.stats_by_day),
+                (10, self.create_session), (4, self.update_session), (4, self.update_user), (2, self.update_instructor),
+            ]
+        raise ValueError(scenario)
+
+
+def percentile(sorted_values, q):
+    # Nearest-rank percentile on an already sorted list
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    endpoints = {}
+    for endpoint, values in sorted(latencies.items()):
+        values.sort()
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "errors": errors[endpoint],
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+            "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        }
+    total = sum(len(v) for v in latencies.values())
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": total,
+        "errors": sum(errors.values()),
+        "throughput_rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+
+def is_error(response):
+    # The API reports most failures as 200 with an {"error": ...} body
+    if response.status_code >= 400:
+        return True
+    if response.headers.get("content-type", "").startswith("application/json"):
+        body = response.json()
+        return isinstance(body, dict) and "error" in body
+    return False
+
+
+async def run_scenario(http, ops, scenario, args):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    recording = False
+
+    async def record(endpoint, request):
+        start = time.perf_counter()
+        response = await request
+        # Read the whole body, so streamed responses are timed to the last byte
+        await response.aread()
+        elapsed = time.perf_counter() - start
+        if recording:
+            latencies[endpoint].append(elapsed)
+            if is_error(response):
+                errors[endpoint] += 1
+
+    # Each worker gets a fixed share of the requests and its own Random(seed + n), so the
+    # request sequence does not depend on how the event loop interleaves the workers
+    workers = [ops.for_worker(n) for n in range(args.concurrency)]
+
+    async def drive(count):
+        async def worker(n):
+            worker_ops = workers[n]
+            if scenario != "crud":
+                weights, functions = zip(*worker_ops.mix(scenario))
+            for _ in range(count // args.concurrency + (n < count % args.concurrency)):
+                if scenario == "crud":
+                    await worker_ops.crud_cycle(http, record)
+                else:
+                    operation = worker_ops.rng.choices(functions, weights)[0]
+                    await record(*operation(http))
+
+        await asyncio.gather(*(worker(n) for n in range(args.concurrency)))
+
+    # crud runs whole cycles of ~20 requests, so scale its iteration count down
+    divisor = 20 if scenario == "crud" else 1
+    await drive(max(args.warmup // divisor, 0))
+    recording = True
+    start = time.perf_counter()
+    await drive(max(args.requests // divisor, 1))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    # The app reads DB_NAME at import time, so point it at the benchmark database first
+    os.environ["DB_NAME"] = args.db
+    load_dotenv()
+    import main as api
+
+    mongo = AsyncMongoClient(os.getenv("MONGO_URI"))
+    try:
+        if not args.no_seed:
+            print(f"Seeding {args.db}: {args.users} users, {args.instructors} instructors, {args.sessions} sessions")
+            await seed(mongo[args.db], args.users, args.instructors, args.sessions, rng)
+            await api.ensure_indexes(mongo[args.db])
+    finally:
+        await mongo.close()
+
+    # One Operations instance for the whole run, so the id counter carries over between scenarios
+    ops = Operations(args, rng)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    results = {}
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as http:
+            for scenario in args.scenarios:
+                results[scenario] = await run_scenario(http, ops, scenario, args)
+                print_scenario(scenario, results[scenario])
+    else:
+        transport = httpx.ASGITransport(app=api.app)
+        async with api.app.router.lifespan_context(api.app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as http:
+                for scenario in args.scenarios:
+                    results[scenario] = await run_scenario(http, ops, scenario, args)
+                    print_scenario(scenario, results[scenario])
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "target": args.url or "in-process",
+            "users": args.users,
+            "instructors": args.instructors,
+            "sessions": args.sessions,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "seed": args.seed,
+        },
+        "scenarios": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+def print_scenario(scenario, result):
+    print(f"\n{scenario}: {result['requests']} requests in {result['elapsed_s']}s "
+          f"({result['throughput_rps']} req/s, {result['errors']} errors)")
+    print(f"  {'endpoint':<40}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for endpoint, stats in result["endpoints"].items():
+        print(f"  {endpoint:<40}{stats['throughput_rps']:>10}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['errors']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed MongoDB and benchmark every route in main.py.")
+    parser.add_argument("--url", help="Benchmark a running server instead of the app in-process. "
+                                      "The server must use the same MONGO_URI and --db.")
+    parser.add_argument("--db", default="collections_bench", help="Database to seed; it is dropped first.")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--instructors", type=int, default=500)
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--no-seed", action="store_true", help="Reuse the data already in --db.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000, help="Measured requests per scenario.")
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured requests before each scenario.")
+    parser.add_argument("--bulk-size", type=int, default=100, help="Items per request in the crud bulk calls.")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for data and request mix.")
+    parser.add_argument("--output", default="bench_results.json")
+    asyncio.run(main(parser.parse_args()))
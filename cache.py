@@ -0,0 +1,72 @@
+import time
+from collections import OrderedDict
+
+
+# Bounded LRU cache whose entries also expire after a fixed TTL
+class TTLCache:
+    def __init__(self, max_size, ttl_seconds, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._invalidations = 0
+
+        # Counters for sizing the cache
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def token(self):
+        # Take a token before reading from the database and pass it to set(), so a read
+        # that raced with an invalidation does not put the stale document back
+        return self._invalidations
+
+    def set(self, key, value, token=None):
+        if token is not None and token != self._invalidations:
+            return
+        if self.max_size <= 0:
+            return
+
+        self._entries[key] = (self.clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *keys):
+        self._invalidations += 1
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._invalidations += 1
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -1,30 +1,224 @@
-from fastapi import FastAPI
-from pymongo import MongoClient
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pymongo import AsyncMongoClient, IndexModel
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from contextlib import asynccontextmanager
+import asyncio
 import os
+import json
 from dotenv import load_dotenv
-from pydantic import BaseModel
-from typing import Optional
+from cache import TTLCache
+from propagation import OutboxWorker, propagate
+from metrics import Metrics, MetricsMiddleware, format_metric
+from serialization import conditional_json_response, dumps, json_response, parse_fields, project, projection
+from pydantic import AfterValidator, BaseModel, ValidationError
+from typing import Annotated, Optional
+from datetime import datetime, timezone
 load_dotenv()
 
-app = FastAPI()
-
 # MongoDB connection
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME")
 
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
+# Connection pool settings (unset values keep the PyMongo defaults)
+MONGO_MAX_POOL_SIZE = os.getenv("MONGO_MAX_POOL_SIZE")
+MONGO_MIN_POOL_SIZE = os.getenv("MONGO_MIN_POOL_SIZE")
+MONGO_WAIT_QUEUE_TIMEOUT_MS = os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS")
+MONGO_TIMEOUT_MS = os.getenv("MONGO_TIMEOUT_MS")
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS")  # e.g. "zstd,snappy,zlib"
+
+# Pagination / streaming settings
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+
+# Bulk ingest settings
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+MAX_BULK_CHUNK_SIZE = 10000
+
+# User / instructor lookup cache settings
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+
+# Fan-out of user / instructor changes into the copies embedded in sessions:
+# "inline" updates sessions in the request, "outbox" queues the change for a background worker
+PROPAGATION_MODE = os.getenv("PROPAGATION_MODE", "inline")
+PROPAGATION_BATCH_SIZE = int(os.getenv("PROPAGATION_BATCH_SIZE", "500"))
+PROPAGATION_INTERVAL_SECONDS = float(os.getenv("PROPAGATION_INTERVAL_SECONDS", "1"))
+PROPAGATION_LEASE_SECONDS = float(os.getenv("PROPAGATION_LEASE_SECONDS", "30"))
+
+# Instrumentation settings
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_SAMPLES = int(os.getenv("SLOW_QUERY_SAMPLES", "100"))
+
+# Indexes ensured at startup; create_indexes is a no-op for indexes that already exist
+INDEXES = {
+    "users": [IndexModel("id", unique=True)],
+    "instructors": [IndexModel("id", unique=True)],
+    "sessions": [
+        IndexModel("id", unique=True),
+        # Compound indexes serve the user / instructor + date range queries, and their
+        # prefixes serve the propagation update_many on user_id / instructor_id
+        IndexModel([("user_id", 1), ("date", 1)]),
+        IndexModel([("instructor_id", 1), ("date", 1)]),
+        IndexModel("date"),
+    ],
+}
+
+# Server error code for unique index violations
+DUPLICATE_KEY_ERROR = 11000
+
+# Client and collections are created by the app lifespan
+client = None
+db = None
+users_collection = None
+instructors_collection = None
+sessions_collection = None
+outbox_worker = None
+
+# Read-through caches for user and instructor documents, keyed by id
+users_cache = TTLCache(CACHE_MAX_SIZE, CACHE_TTL_SECONDS)
+instructors_cache = TTLCache(CACHE_MAX_SIZE, CACHE_TTL_SECONDS)
+
+# Request, MongoDB command and connection pool metrics served at /metrics
+metrics = Metrics(SLOW_QUERY_MS, SLOW_QUERY_SAMPLES)
+
+
+def mongo_client_options():
+    options = {}
+    if MONGO_MAX_POOL_SIZE:
+        options["maxPoolSize"] = int(MONGO_MAX_POOL_SIZE)
+    if MONGO_MIN_POOL_SIZE:
+        options["minPoolSize"] = int(MONGO_MIN_POOL_SIZE)
+    if MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options["waitQueueTimeoutMS"] = int(MONGO_WAIT_QUEUE_TIMEOUT_MS)
+    if MONGO_TIMEOUT_MS:
+        options["timeoutMS"] = int(MONGO_TIMEOUT_MS)
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    return options
+
+
+async def ensure_indexes(db):
+    await asyncio.gather(*(
+        db[collection_name].create_indexes(indexes)
+        for collection_name, indexes in INDEXES.items()
+    ))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client, db, users_collection, instructors_collection, sessions_collection, outbox_worker
+    client = AsyncMongoClient(
+        MONGO_URI,
+        event_listeners=[metrics.command_listener, metrics.pool_listener],
+        # Read dates back as UTC-aware datetimes so responses carry the +00:00 offset
+        tz_aware=True,
+        tzinfo=timezone.utc,
+        **mongo_client_options(),
+    )
+    db = client[DB_NAME]
+
+    # Collections
+    users_collection = db["users"]
+    instructors_collection = db["instructors"]
+    sessions_collection = db["sessions"]
+
+    await ensure_indexes(db)
+
+    if PROPAGATION_MODE == "outbox":
+        outbox_worker = OutboxWorker(
+            db, PROPAGATION_BATCH_SIZE, PROPAGATION_INTERVAL_SECONDS, PROPAGATION_LEASE_SECONDS
+        )
+        outbox_worker.start()
+
+    yield
+
+    if outbox_worker is not None:
+        await outbox_worker.stop()
+    await client.close()
 
-# Collections
-users_collection = db["users"]
-instructors_collection = db["instructors"]
-sessions_collection = db["sessions"]
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware, metrics=metrics)
 
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "MongoDB connected and collections ready!"}
 
+
+# List helpers shared by the /users, /instructors and /sessions endpoints
+def keyset_query(query, after):
+    if after is None:
+        return query
+    return {**query, "id": {"$gt": after}}
+
+async def list_page(request, collection, query, after, limit, fields):
+    # Keyset pagination on "id": fetch one extra document to know if there is a next page.
+    # "id" is always projected because it is the cursor. The body stays a bare array and the
+    # cursor for the next page goes in the X-Next-After and Link headers.
+    query = keyset_query(query, after)
+    docs = await collection.find(query, projection(fields, always=("id",))).sort("id", 1).limit(limit + 1).to_list()
+    headers = {}
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_after = docs[-1]["id"]
+        next_url = request.url.include_query_params(after=next_after, limit=limit)
+        headers = {"X-Next-After": str(next_after), "Link": f'<{next_url}>; rel="next"'}
+    return conditional_json_response(request, docs, headers)
+
+def stream_cursor(collection, query, after, fields):
+    # Walk the cursor in bounded batches so memory stays flat for any collection size
+    query = keyset_query(query, after)
+    return collection.find(query, projection(fields), batch_size=STREAM_BATCH_SIZE).sort("id", 1)
+
+def stream_ndjson(collection, query, after, fields):
+    cursor = stream_cursor(collection, query, after, fields)
+
+    async def lines():
+        async with cursor:
+            async for doc in cursor:
+                yield dumps(doc) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def stream_json_array(collection, query, fields):
+    # Unpaged requests keep the original bare-array body, encoded as the cursor is walked
+    cursor = stream_cursor(collection, query, None, fields)
+
+    async def chunks():
+        separator = b""
+        yield b"["
+        async with cursor:
+            async for doc in cursor:
+                yield separator + dumps(doc)
+                separator = b","
+        yield b"]"
+
+    return StreamingResponse(chunks(), media_type="application/json")
+
+async def list_collection(request, collection, after, limit, stream, fields, query=None):
+    try:
+        fields = parse_fields(fields)
+    except ValueError as e:
+        return {"error": str(e)}
+    query = query or {}
+    if stream:
+        return stream_ndjson(collection, query, after, fields)
+    # Only page when asked to, so callers that expect every document keep getting them
+    if after is None and limit is None:
+        return stream_json_array(collection, query, fields)
+    return await list_page(request, collection, query, after, limit or DEFAULT_PAGE_SIZE, fields)
+
+# Dates are stored and returned in UTC; inputs without an offset are taken to be UTC
+def as_utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+UTCDatetime = Annotated[datetime, AfterValidator(as_utc)]
+
 #Define a User model for request validation
 class User(BaseModel):
     id: int
@@ -43,110 +237,321 @@ class Instructor(BaseModel):
 class Session(BaseModel):
     id: int
     topic: str
-    date: str
+    date: UTCDatetime
     instructor_id: int
     user_id: int
 
 
+# Cached lookups used by the get_* routes
+async def fetch_cached(cache, collection, doc_id):
+    doc = cache.get(doc_id)
+    if doc is None:
+        token = cache.token()
+        doc = await collection.find_one({"id": doc_id}, {"_id": 0})
+        if doc:
+            cache.set(doc_id, doc, token)
+    return doc
+
+async def fetch_user(user_id):
+    return await fetch_cached(users_cache, users_collection, user_id)
+
+async def fetch_instructor(instructor_id):
+    return await fetch_cached(instructors_cache, instructors_collection, instructor_id)
+
+# Session writes embed the user and instructor as they are in MongoDB now, not the per-process
+# cache: with several workers, an update served by another process leaves this cache stale, and
+# propagation for that update has already run, so a stale copy embedded here would never be fixed
+async def fetch_session_refs(session):
+    return await asyncio.gather(
+        users_collection.find_one({"id": session.user_id}, {"_id": 0}),
+        instructors_collection.find_one({"id": session.instructor_id}, {"_id": 0}),
+    )
+
+
+# Refresh the user / instructor copies embedded in sessions from the source document as it is
+# when the change is applied (None after a delete), never from this request's copy: an
+# overlapping PUT may already have replaced it. This runs after the source write has committed
+# and is not atomic with it: if the process dies in between, the change is lost and
+# "python propagation.py reconcile" repairs the drift.
+async def propagate_change(kind, old_id, new_id):
+    if outbox_worker is not None:
+        await outbox_worker.enqueue(kind, old_id, new_id)
+    else:
+        await propagate(db, [(kind, old_id, new_id)])
+
+
+# Bulk ingest helpers shared by the /users/bulk, /instructors/bulk and /sessions/bulk endpoints
+async def read_bulk_items(request: Request):
+    # NDJSON bodies are parsed line by line as they arrive; anything else must be a JSON array
+    if "ndjson" in request.headers.get("content-type", ""):
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+    else:
+        items = json.loads(await request.body())
+        if not isinstance(items, list):
+            raise ValueError("Request body must be a JSON array or NDJSON.")
+        for item in items:
+            yield item
+
+def validate_bulk_item(model, item):
+    if isinstance(item, bytes):
+        return model.model_validate_json(item)
+    return model.model_validate(item)
+
+async def find_by_ids(collection, ids, projection):
+    docs = await collection.find({"id": {"$in": list(ids)}}, projection).to_list()
+    return {doc["id"]: doc for doc in docs}
+
+async def insert_bulk_chunk(collection, model, label, chunk, prepare, results):
+    # chunk is a list of (index, raw item); results collects one entry per input item
+    errors = {}
+    valid = []
+    for index, item in chunk:
+        try:
+            valid.append((index, validate_bulk_item(model, item)))
+        except (ValidationError, ValueError) as e:
+            errors[index] = (None, str(e))
+
+    docs = await prepare(valid, errors)
+
+    # Duplicate IDs, both within the chunk and already stored, are rejected by the unique index
+    if docs:
+        try:
+            await collection.insert_many([doc for _, doc in docs], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                index, doc = docs[write_error["index"]]
+                if write_error.get("code") == DUPLICATE_KEY_ERROR:
+                    message = f"{label} with this ID already exists."
+                else:
+                    message = write_error.get("errmsg", "Insert failed.")
+                errors[index] = (doc["id"], message)
+
+    for index, doc in docs:
+        if index not in errors:
+            results.append({"index": index, "id": doc["id"], "status": "created"})
+    for index, (item_id, message) in errors.items():
+        results.append({"index": index, "id": item_id, "status": "error", "error": message})
+
+async def bulk_create(request, collection, model, label, chunk_size, prepare):
+    results = []
+    chunk = []
+    try:
+        async for item in read_bulk_items(request):
+            chunk.append((len(results) + len(chunk), item))
+            if len(chunk) >= chunk_size:
+                await insert_bulk_chunk(collection, model, label, chunk, prepare, results)
+                chunk = []
+        if chunk:
+            await insert_bulk_chunk(collection, model, label, chunk, prepare, results)
+    except ValueError as e:
+        # Malformed JSON array body; chunks already written are still reported
+        return {"error": str(e), "results": sorted(results, key=lambda r: r["index"])}
+
+    results.sort(key=lambda r: r["index"])
+    created = sum(1 for r in results if r["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+async def prepare_plain(docs, errors):
+    return [(index, obj.model_dump()) for index, obj in docs]
+
+async def prepare_sessions(docs, errors):
+    # Validate foreign keys with one $in query per referenced collection and embed the documents
+    users, instructors = await asyncio.gather(
+        find_by_ids(users_collection, {obj.user_id for _, obj in docs}, {"_id": 0}),
+        find_by_ids(instructors_collection, {obj.instructor_id for _, obj in docs}, {"_id": 0}),
+    )
+    prepared = []
+    for index, obj in docs:
+        if obj.user_id not in users:
+            errors[index] = (obj.id, f"User ID {obj.user_id} does not exist.")
+        elif obj.instructor_id not in instructors:
+            errors[index] = (obj.id, f"Instructor ID {obj.instructor_id} does not exist.")
+        else:
+            session_data = obj.model_dump()
+            session_data["user"] = users[obj.user_id]
+            session_data["instructor"] = instructors[obj.instructor_id]
+            prepared.append((index, session_data))
+    return prepared
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return {"users": users_cache.stats(), "instructors": instructors_cache.stats()}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    caches = {"users": users_cache.stats(), "instructors": instructors_cache.stats()}
+    parts = [metrics.render()]
+    for counter in ("hits", "misses", "evictions", "expirations"):
+        samples = [({"cache": name}, stats[counter]) for name, stats in caches.items()]
+        parts.append(format_metric(f"cache_{counter}_total", "counter", f"Lookup cache {counter}.", samples))
+    samples = [({"cache": name}, stats["size"]) for name, stats in caches.items()]
+    parts.append(format_metric("cache_entries", "gauge", "Entries in the lookup cache.", samples))
+    return PlainTextResponse("".join(parts), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/slow-queries")
+async def get_slow_queries():
+    return list(metrics.slow_queries)
+
+
 #create user
 @app.post("/users")
-def create_user(user: User):
-    # Check if user with same id already exists
-    if users_collection.find_one({"id": user.id}):
+async def create_user(user: User):
+    # Insert user; the unique index on id rejects duplicates
+    try:
+        await users_collection.insert_one(user.dict())
+    except DuplicateKeyError:
         return {"error": "User with this ID already exists."}
+    return json_response({"message": "User created successfully!", "user": user.model_dump()})
 
-    # Insert user
-    users_collection.insert_one(user.dict())
-    return {"message": "User created successfully!", "user": user}
+@app.post("/users/bulk")
+async def create_users_bulk(
+    request: Request,
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=MAX_BULK_CHUNK_SIZE),
+):
+    return json_response(await bulk_create(request, users_collection, User, "User", chunk_size, prepare_plain))
 
 @app.get("/users")
-def get_users():
-    users = list(users_collection.find({}, {"_id": 0}))  # exclude MongoDB _id field
-    return users
+async def get_users(
+    request: Request,
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False,
+    fields: Optional[str] = None,
+):
+    return await list_collection(request, users_collection, after, limit, stream, fields)
 
 @app.get("/users/{user_id}")
-def get_user(user_id: int):
-    user = users_collection.find_one({"id": user_id}, {"_id": 0})
+async def get_user(request: Request, user_id: int, fields: Optional[str] = None):
+    try:
+        fields = parse_fields(fields)
+    except ValueError as e:
+        return {"error": str(e)}
+    # Served from the lookup cache, so the field selection is applied in Python
+    user = await fetch_user(user_id)
     if not user:
         return {"error": "User not found"}
-    return user
+    return conditional_json_response(request, project(user, fields))
 
 @app.put("/users/{user_id}")
-def update_user(user_id: int, user: User):
-    result = users_collection.update_one(
-        {"id": user_id},
-        {"$set": user.dict()}
-    )
+async def update_user(user_id: int, user: User):
+    try:
+        result = await users_collection.update_one(
+            {"id": user_id},
+            {"$set": user.dict()}
+        )
+    except DuplicateKeyError:
+        return {"error": "User with this ID already exists."}
+    users_cache.invalidate(user_id, user.id)
     if result.matched_count == 0:
         return {"error": "User not found"}
+    # Nothing to fan out when the PUT did not change the document
+    if result.modified_count or user.id != user_id:
+        await propagate_change("user", user_id, user.id)
     return {"message": "User updated successfully!"}
 
 @app.delete("/users/{user_id}")
-def delete_user(user_id: int):
-    result = users_collection.delete_one({"id": user_id})
+async def delete_user(user_id: int):
+    result = await users_collection.delete_one({"id": user_id})
+    users_cache.invalidate(user_id)
     if result.deleted_count == 0:
         return {"error": "User not found"}
+    await propagate_change("user", user_id, user_id)
     return {"message": "User deleted successfully!"}
 
 
 @app.post("/instructors")
-def create_instructor(instructor: Instructor):
-    if instructors_collection.find_one({"id": instructor.id}):
+async def create_instructor(instructor: Instructor):
+    try:
+        await instructors_collection.insert_one(instructor.dict())
+    except DuplicateKeyError:
         return {"error": "Instructor with this ID already exists."}
-
-    instructors_collection.insert_one(instructor.dict())
-    return {"message": "Instructor created successfully!", "instructor": instructor}
+    return json_response({"message": "Instructor created successfully!", "instructor": instructor.model_dump()})
+
+@app.post("/instructors/bulk")
+async def create_instructors_bulk(
+    request: Request,
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=MAX_BULK_CHUNK_SIZE),
+):
+    return json_response(
+        await bulk_create(request, instructors_collection, Instructor, "Instructor", chunk_size, prepare_plain)
+    )
 
 @app.get("/instructors")
-def get_instructors():
-    instructors = list(instructors_collection.find({}, {"_id": 0}))
-    return instructors
+async def get_instructors(
+    request: Request,
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False,
+    fields: Optional[str] = None,
+):
+    return await list_collection(request, instructors_collection, after, limit, stream, fields)
 
 @app.get("/instructors/{instructor_id}")
-def get_instructor(instructor_id: int):
-    instructor = instructors_collection.find_one({"id": instructor_id}, {"_id": 0})  # exclude _id
+async def get_instructor(request: Request, instructor_id: int, fields: Optional[str] = None):
+    try:
+        fields = parse_fields(fields)
+    except ValueError as e:
+        return {"error": str(e)}
+    # Served from the lookup cache, so the field selection is applied in Python
+    instructor = await fetch_instructor(instructor_id)
     if not instructor:
         return {"error": "Instructor not found"}
-    return instructor
+    return conditional_json_response(request, project(instructor, fields))
 
 
 @app.put("/instructors/{instructor_id}")
-def update_instructor(instructor_id: int, instructor: Instructor):
+async def update_instructor(instructor_id: int, instructor: Instructor):
     # Update the instructor document
-    result = instructors_collection.update_one(
-        {"id": instructor_id},  # find by id
-        {"$set": instructor.dict()}  # set new values
-    )
+    try:
+        result = await instructors_collection.update_one(
+            {"id": instructor_id},  # find by id
+            {"$set": instructor.dict()}  # set new values
+        )
+    except DuplicateKeyError:
+        return {"error": "Instructor with this ID already exists."}
+    instructors_cache.invalidate(instructor_id, instructor.id)
 
     if result.matched_count == 0:
         return {"error": "Instructor not found"}
+    # Nothing to fan out when the PUT did not change the document
+    if result.modified_count or instructor.id != instructor_id:
+        await propagate_change("instructor", instructor_id, instructor.id)
 
     return {"message": "Instructor updated successfully!"}
 
 
 @app.delete("/instructors/{instructor_id}")
-def delete_instructor(instructor_id: int):
-    result = instructors_collection.delete_one({"id": instructor_id})
+async def delete_instructor(instructor_id: int):
+    result = await instructors_collection.delete_one({"id": instructor_id})
+    instructors_cache.invalidate(instructor_id)
 
     if result.deleted_count == 0:
         return {"error": "Instructor not found"}
+    await propagate_change("instructor", instructor_id, instructor_id)
 
     return {"message": "Instructor deleted successfully!"}
 
 
 @app.post("/sessions")
-def create_session(session: Session):
-    # Check session ID
-    if sessions_collection.find_one({"id": session.id}):
-        return {"error": "Session with this ID already exists."}
+async def create_session(session: Session):
+    # User and instructor lookups are independent, so run them concurrently
+    user, instructor = await fetch_session_refs(session)
 
     # Validate user_id exists
-    user = users_collection.find_one({"id": session.user_id}, {"_id": 0})
     if not user:
         return {"error": f"User ID {session.user_id} does not exist."}
 
     # Validate instructor_id exists
-    instructor = instructors_collection.find_one({"id": session.instructor_id}, {"_id": 0})
     if not instructor:
         return {"error": f"Instructor ID {session.instructor_id} does not exist."}
 
@@ -155,30 +560,116 @@ def create_session(session: Session):
     session_data["user"] = user
     session_data["instructor"] = instructor
 
-    sessions_collection.insert_one(session_data)
-    return {"message": "Session created successfully!", "session": session_data}
+    # insert_one adds the generated ObjectId to session_data; keep it out of the response
+    try:
+        await sessions_collection.insert_one(session_data)
+    except DuplicateKeyError:
+        return {"error": "Session with this ID already exists."}
+    session_data.pop("_id", None)
+    return json_response({"message": "Session created successfully!", "session": session_data})
+
+@app.post("/sessions/bulk")
+async def create_sessions_bulk(
+    request: Request,
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=MAX_BULK_CHUNK_SIZE),
+):
+    return json_response(await bulk_create(request, sessions_collection, Session, "Session", chunk_size, prepare_sessions))
+
+# Session filter built from the user / instructor / date range query parameters;
+# "from" is inclusive and "to" is exclusive
+def session_query(user_id, instructor_id, date_from, date_to):
+    query = {}
+    if user_id is not None:
+        query["user_id"] = user_id
+    if instructor_id is not None:
+        query["instructor_id"] = instructor_id
+    if date_from is not None or date_to is not None:
+        query["date"] = {}
+        if date_from is not None:
+            query["date"]["$gte"] = as_utc(date_from)
+        if date_to is not None:
+            query["date"]["$lt"] = as_utc(date_to)
+    return query
 
 @app.get("/sessions")
-def get_sessions():
-    sessions = list(sessions_collection.find({}, {"_id": 0}))  # exclude MongoDB _id
-    return sessions
+async def get_sessions(
+    request: Request,
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False,
+    user_id: Optional[int] = None,
+    instructor_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    fields: Optional[str] = None,
+):
+    query = session_query(user_id, instructor_id, date_from, date_to)
+    return await list_collection(request, sessions_collection, after, limit, stream, fields, query)
+
+# Session counts computed by MongoDB with $match / $group pipelines
+@app.get("/sessions/stats/by-instructor")
+async def get_session_counts_by_instructor(
+    user_id: Optional[int] = None,
+    instructor_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+):
+    pipeline = [
+        {"$match": session_query(user_id, instructor_id, date_from, date_to)},
+        {"$group": {
+            "_id": "$instructor_id",
+            "name": {"$first": "$instructor.name"},
+            "count": {"$sum": 1},
+        }},
+        {"$sort": {"count": -1, "_id": 1}},
+        {"$project": {"_id": 0, "instructor_id": "$_id", "name": 1, "count": 1}},
+    ]
+    cursor = await sessions_collection.aggregate(pipeline)
+    return json_response(await cursor.to_list())
+
+@app.get("/sessions/stats/by-day")
+async def get_session_counts_by_day(
+    user_id: Optional[int] = None,
+    instructor_id: Optional[int] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+):
+    # $dateToString fails on non-date values, and migrate_session_dates.py leaves dates it could
+    # not parse as strings, so only real dates are counted
+    query = session_query(user_id, instructor_id, date_from, date_to)
+    query.setdefault("date", {})["$type"] = "date"
+    pipeline = [
+        {"$match": query},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}},
+            "count": {"$sum": 1},
+        }},
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "day": "$_id", "count": 1}},
+    ]
+    cursor = await sessions_collection.aggregate(pipeline)
+    return json_response(await cursor.to_list())
 
 @app.get("/sessions/{session_id}")
-def get_session(session_id: int):
-    session = sessions_collection.find_one({"id": session_id}, {"_id": 0})
-    if not session:
+async def get_session(request: Request, session_id: int, fields: Optional[str] = None):
+    try:
+        fields = parse_fields(fields)
+    except ValueError as e:
+        return {"error": str(e)}
+    session = await sessions_collection.find_one({"id": session_id}, projection(fields))
+    if session is None:
         return {"error": "Session not found"}
-    return session
+    return conditional_json_response(request, session)
 
 @app.put("/sessions/{session_id}")
-def update_session(session_id: int, session: Session):
+async def update_session(session_id: int, session: Session):
+    user, instructor = await fetch_session_refs(session)
+
     # Validate user_id exists
-    user = users_collection.find_one({"id": session.user_id}, {"_id": 0})
     if not user:
         return {"error": f"User ID {session.user_id} does not exist."}
 
     # Validate instructor_id exists
-    instructor = instructors_collection.find_one({"id": session.instructor_id}, {"_id": 0})
     if not instructor:
         return {"error": f"Instructor ID {session.instructor_id} does not exist."}
 
@@ -188,19 +679,22 @@ def update_session(session_id: int, session: Session):
     session_data["instructor"] = instructor
 
     # Update the session
-    result = sessions_collection.update_one(
-        {"id": session_id},
-        {"$set": session_data}
-    )
+    try:
+        result = await sessions_collection.update_one(
+            {"id": session_id},
+            {"$set": session_data}
+        )
+    except DuplicateKeyError:
+        return {"error": "Session with this ID already exists."}
 
     if result.matched_count == 0:
         return {"error": "Session not found"}
 
-    return {"message": "Session updated successfully!", "session": session_data}
+    return json_response({"message": "Session updated successfully!", "session": session_data})
 
 @app.delete("/sessions/{session_id}")
-def delete_session(session_id: int):
-    result = sessions_collection.delete_one({"id": session_id})
+async def delete_session(session_id: int):
+    result = await sessions_collection.delete_one({"id": session_id})
     if result.deleted_count == 0:
         return {"error": "Session not found"}
     return {"message": "Session deleted successfully!"}
@@ -0,0 +1,261 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+
+from pymongo import monitoring
+
+# Latency buckets in seconds, shared by the HTTP, MongoDB and pool histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# Prometheus text exposition helpers
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def format_metric(name, kind, help_text, samples):
+    # samples is an iterable of (labels dict, value) for counters and gauges,
+    # or (labels dict, Histogram) for histograms
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        if kind != "histogram":
+            lines.append(f"{name}{_labels(labels)} {value}")
+            continue
+        cumulative = 0
+        for bound, count in zip(value.buckets + ("+Inf",), value.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {value.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {value.count}")
+    return "\n".join(lines) + "\n"
+
+
+# Everything below is updated from the event loop thread (the ASGI app and the
+# AsyncMongoClient listeners), so plain dicts and counters are enough
+class Metrics:
+    def __init__(self, slow_query_ms=100, slow_query_samples=100):
+        # HTTP
+        self.request_latency = defaultdict(Histogram)  # (method, route) -> Histogram
+        self.request_status = defaultdict(int)         # (method, route, status) -> count
+        self.in_flight = 0
+
+        # MongoDB commands
+        self.command_latency = defaultdict(Histogram)  # (collection, command) -> Histogram
+        self.command_failures = defaultdict(int)       # (collection, command) -> count
+        self.slow_query_ms = slow_query_ms
+        self.slow_queries = deque(maxlen=slow_query_samples)
+
+        # Connection pool, per server address
+        self.pool_open = defaultdict(int)
+        self.pool_in_use = defaultdict(int)
+        self.pool_checkout_failures = defaultdict(int)
+        self.pool_clears = defaultdict(int)
+        self.pool_checkout_latency = defaultdict(Histogram)
+
+        self.command_listener = MongoCommandListener(self)
+        self.pool_listener = MongoPoolListener(self)
+
+    def render(self):
+        return "".join([
+            format_metric(
+                "http_request_duration_seconds", "histogram", "HTTP request latency by route.",
+                [({"method": m, "route": r}, h) for (m, r), h in self.request_latency.items()]
+            ),
+            format_metric(
+                "http_requests_total", "counter", "HTTP responses by route and status.",
+                [({"method": m, "route": r, "status": s}, n) for (m, r, s), n in self.request_status.items()]
+            ),
+            format_metric(
+                "http_requests_in_flight", "gauge", "HTTP requests currently being served.",
+                [({}, self.in_flight)]
+            ),
+            format_metric(
+                "mongodb_command_duration_seconds", "histogram", "MongoDB command latency by collection.",
+                [({"collection": c, "command": n}, h) for (c, n), h in self.command_latency.items()]
+            ),
+            format_metric(
+                "mongodb_command_failures_total", "counter", "Failed MongoDB commands by collection.",
+                [({"collection": c, "command": n}, v) for (c, n), v in self.command_failures.items()]
+            ),
+            format_metric(
+                "mongodb_pool_connections", "gauge", "Open connections in the pool.",
+                [({"address": a}, v) for a, v in self.pool_open.items()]
+            ),
+            format_metric(
+                "mongodb_pool_connections_in_use", "gauge", "Connections checked out of the pool.",
+                [({"address": a}, v) for a, v in self.pool_in_use.items()]
+            ),
+            format_metric(
+                "mongodb_pool_checkout_duration_seconds", "histogram", "Time spent waiting to check out a connection.",
+                [({"address": a}, h) for a, h in self.pool_checkout_latency.items()]
+            ),
+            format_metric(
+                "mongodb_pool_checkout_failures_total", "counter", "Failed connection checkouts.",
+                [({"address": a}, v) for a, v in self.pool_checkout_failures.items()]
+            ),
+            format_metric(
+                "mongodb_pool_clears_total", "counter", "Times the pool was cleared.",
+                [({"address": a}, v) for a, v in self.pool_clears.items()]
+            ),
+        ])
+
+
+# Pure ASGI middleware, so it adds no per-request objects beyond a wrapped send()
+class MetricsMiddleware:
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.in_flight -= 1
+            # The router stores the matched route in the scope; label by its template, not the raw path
+            route = scope.get("route")
+            route = getattr(route, "path", "<unmatched>")
+            metrics.request_latency[(scope["method"], route)].observe(elapsed)
+            metrics.request_status[(scope["method"], route, status)] += 1
+
+
+def _address(address):
+    return "%s:%s" % address
+
+
+# Command fields that describe the query shape; their values may hold user data
+SHAPE_FIELDS = ("filter", "query", "q", "sort", "projection", "pipeline", "update", "u", "updates", "deletes", "key")
+SHAPE_MAX_ITEMS = 10
+
+
+# Keep the keys and structure of a command argument, replacing every literal value with "?"
+def redact(value):
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [redact(item) for item in value[:SHAPE_MAX_ITEMS]]
+        if all(item == "?" for item in items):
+            return "?"
+        if len(value) > SHAPE_MAX_ITEMS:
+            items.append("...")
+        return items
+    return "?"
+
+
+# "update" names the collection on update commands and holds the document on findAndModify,
+# so only structured values are kept
+def command_shape(command):
+    return {
+        field: redact(command[field])
+        for field in SHAPE_FIELDS
+        if isinstance(command.get(field), (dict, list, tuple))
+    }
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self._commands = {}  # request_id -> (collection, command document) of in-flight commands
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        self._commands[event.request_id] = (target if isinstance(target, str) else "", event.command)
+
+    def _finished(self, event):
+        collection, command = self._commands.pop(event.request_id, ("", {}))
+        seconds = event.duration_micros / 1_000_000
+        self.metrics.command_latency[(collection, event.command_name)].observe(seconds)
+        if seconds * 1000 >= self.metrics.slow_query_ms:
+            self.metrics.slow_queries.append({
+                "database": event.database_name,
+                "collection": collection,
+                "command": event.command_name,
+                "shape": command_shape(command),
+                "duration_ms": round(seconds * 1000, 3),
+                "at": time.time(),
+            })
+        return collection
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        collection = self._finished(event)
+        self.metrics.command_failures[(collection, event.command_name)] += 1
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def pool_created(self, event):
+        self.metrics.pool_open[_address(event.address)] = 0
+        self.metrics.pool_in_use[_address(event.address)] = 0
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.metrics.pool_clears[_address(event.address)] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.metrics.pool_open[_address(event.address)] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.metrics.pool_open[_address(event.address)] -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.metrics.pool_checkout_failures[_address(event.address)] += 1
+
+    def connection_checked_out(self, event):
+        address = _address(event.address)
+        self.metrics.pool_in_use[address] += 1
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            self.metrics.pool_checkout_latency[address].observe(duration)
+
+    def connection_checked_in(self, event):
+        self.metrics.pool_in_use[_address(event.address)] -= 1
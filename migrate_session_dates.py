@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import os
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from pydantic import TypeAdapter, ValidationError
+from pymongo import AsyncMongoClient, UpdateOne
+
+# Parse with the same rules the API applies to Session.date: inputs without an offset are UTC
+def parse_date(value):
+    date = TypeAdapter(datetime).validate_python(value)
+    if date.tzinfo is None:
+        return date.replace(tzinfo=timezone.utc)
+    return date.astimezone(timezone.utc)
+
+
+# Convert sessions whose date is still a string into a BSON datetime. Unparseable values
+# are left untouched and reported so they can be fixed by hand.
+async def migrate_session_dates(db, batch_size=1000):
+    sessions = db["sessions"]
+    converted = 0
+    failed = []
+    ops = []
+
+    async with sessions.find({"date": {"$type": "string"}}, {"id": 1, "date": 1}, batch_size=batch_size) as cursor:
+        async for doc in cursor:
+            try:
+                date = parse_date(doc["date"])
+            except ValidationError:
+                failed.append({"id": doc.get("id"), "date": doc["date"]})
+                continue
+            ops.append(UpdateOne({"_id": doc["_id"], "date": doc["date"]}, {"$set": {"date": date}}))
+            if len(ops) >= batch_size:
+                result = await sessions.bulk_write(ops, ordered=False)
+                converted += result.modified_count
+                ops = []
+    if ops:
+        result = await sessions.bulk_write(ops, ordered=False)
+        converted += result.modified_count
+
+    return {"converted": converted, "failed": failed}
+
+
+async def main(batch_size):
+    load_dotenv()
+    client = AsyncMongoClient(os.getenv("MONGO_URI"), tz_aware=True, tzinfo=timezone.utc)
+    try:
+        print(await migrate_session_dates(client[os.getenv("DB_NAME")], batch_size))
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store Session.date as a BSON datetime instead of a string.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient, ReturnDocument, UpdateMany
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_COLLECTION = "propagation_outbox"
+LOCK_COLLECTION = "propagation_locks"
+
+# Embedded document field in sessions -> (source collection, reference field)
+EMBEDDED = {
+    "user": ("users", "user_id"),
+    "instructor": ("instructors", "instructor_id"),
+}
+
+
+# Filter and update that refresh every embedded copy of one user or instructor through the
+# indexed reference field. A PUT may change the id itself, so the reference moves from old_id
+# to new_id along with the copy. doc is the source as read at apply time, None once deleted.
+def propagation_update(kind, old_id, new_id, doc):
+    _, ref_field = EMBEDDED[kind]
+    return {ref_field: old_id}, {"$set": {ref_field: new_id, kind: doc}}
+
+
+def propagation_op(kind, old_id, new_id, doc):
+    return UpdateMany(*propagation_update(kind, old_id, new_id, doc))
+
+
+async def load_sources(db, changes):
+    # Current source documents for a batch of (kind, old_id, new_id) changes, keyed by (kind, new_id)
+    docs = {}
+    for kind, (collection_name, _) in EMBEDDED.items():
+        ids = list({new_id for k, _, new_id in changes if k == kind})
+        if ids:
+            async with db[collection_name].find({"id": {"$in": ids}}, {"_id": 0}) as cursor:
+                async for doc in cursor:
+                    docs[(kind, doc["id"])] = doc
+    return docs
+
+
+# Changes carry ids only; the embedded copy is whatever the source holds when the change is
+# applied, so overlapping updates cannot leave an older copy behind however their fan-outs
+# interleave. A source written again between the read and the session write is re-applied
+# until the copy written matches what the source still holds.
+async def propagate(db, changes):
+    modified = 0
+    while changes:
+        docs = await load_sources(db, changes)
+        ops = [propagation_op(kind, old_id, new_id, docs.get((kind, new_id))) for kind, old_id, new_id in changes]
+        result = await db["sessions"].bulk_write(ops, ordered=True)
+        modified += result.modified_count
+        current = await load_sources(db, changes)
+        changes = list({
+            (kind, new_id, new_id) for kind, _, new_id in changes
+            if current.get((kind, new_id)) != docs.get((kind, new_id))
+        })
+    return modified
+
+
+def outbox_change(entry):
+    if "old_id" in entry:
+        return entry["kind"], entry["old_id"], entry["new_id"]
+    # Entries queued before the outbox stored ids only carry the document that was written
+    doc = entry["doc"]
+    return entry["kind"], entry["ref_id"], doc["id"] if doc is not None else entry["ref_id"]
+
+
+# Outbox: changes are recorded in a collection and applied in batches by a background task,
+# so queued changes survive a restart and fan-out work leaves the request path. The outbox
+# insert is a separate write after the user / instructor update has committed (no
+# transaction), so a crash between the two loses that change; run "propagation.py reconcile"
+# to repair the drift.
+#
+# Every app process starts a worker, but only the one holding the outbox lease drains it, so
+# the same entries are not fanned out several times over. Entries hold ids, not documents,
+# and propagate() reads the source at apply time, so their order does not decide which copy
+# ends up embedded.
+class OutboxWorker:
+    def __init__(self, db, batch_size=500, interval_seconds=1.0, lease_seconds=30.0):
+        self.db = db
+        self.outbox = db[OUTBOX_COLLECTION]
+        self.locks = db[LOCK_COLLECTION]
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def acquire_lease(self):
+        # Take the lease if it is free or expired, or extend it if we already hold it. When
+        # another worker holds it, the filter misses and the upsert hits the unique _id.
+        now = datetime.now(timezone.utc)
+        try:
+            lock = await self.locks.find_one_and_update(
+                {"_id": OUTBOX_COLLECTION, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            return False
+        return lock is not None and lock["owner"] == self.owner
+
+    async def release_lease(self):
+        await self.locks.delete_one({"_id": OUTBOX_COLLECTION, "owner": self.owner})
+
+    async def enqueue(self, kind, old_id, new_id):
+        await self.outbox.insert_one({
+            "kind": kind,
+            "old_id": old_id,
+            "new_id": new_id,
+            "created_at": datetime.now(timezone.utc),
+        })
+        self._wakeup.set()
+
+    async def drain_once(self):
+        # The lease is renewed before every batch; a batch must finish well within lease_seconds
+        if not await self.acquire_lease():
+            return 0
+
+        # Roughly oldest first, so a chain of id changes (1 -> 2, then 2 -> 3) usually moves
+        # the references in one batch; ObjectId order is only approximate across processes
+        entries = await self.outbox.find().sort("_id", 1).limit(self.batch_size).to_list()
+        if not entries:
+            return 0
+
+        await propagate(self.db, [outbox_change(e) for e in entries])
+        await self.outbox.delete_many({"_id": {"$in": [e["_id"] for e in entries]}})
+        return len(entries)
+
+    async def drain(self):
+        total = 0
+        while True:
+            applied = await self.drain_once()
+            total += applied
+            if applied < self.batch_size:
+                return total
+
+    async def run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.drain()
+            except Exception:
+                logger.exception("Propagation outbox batch failed; retrying")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Flush what is left if we hold the lease; anything else stays in the outbox for the
+        # worker that takes the lease next
+        try:
+            await self.drain()
+            await self.release_lease()
+        except Exception:
+            logger.exception("Could not flush propagation outbox on shutdown")
+
+
+async def clear_orphans(sessions, kind, ref_field, missing):
+    result = await sessions.update_many(
+        {ref_field: {"$in": missing}, kind: {"$ne": None}},
+        {"$set": {kind: None}},
+    )
+    return result.modified_count
+
+
+# Repair drift in bulk: rewrite embedded copies that differ from the source document and
+# clear copies whose source no longer exists
+async def reconcile(db, batch_size=1000):
+    sessions = db["sessions"]
+    summary = {}
+
+    for kind, (collection_name, ref_field) in EMBEDDED.items():
+        refreshed = 0
+        ops = []
+        async with db[collection_name].find({}, {"_id": 0}, batch_size=batch_size) as cursor:
+            async for doc in cursor:
+                ops.append(UpdateMany(
+                    {ref_field: doc["id"], kind: {"$ne": doc}},
+                    {"$set": {kind: doc}},
+                ))
+                if len(ops) >= batch_size:
+                    result = await sessions.bulk_write(ops, ordered=False)
+                    refreshed += result.modified_count
+                    ops = []
+        if ops:
+            result = await sessions.bulk_write(ops, ordered=False)
+            refreshed += result.modified_count
+
+        # Referenced ids with no source document, streamed from the server and cleared in
+        # batches, so neither side is ever sent as one list that could outgrow a BSON document
+        orphaned = 0
+        missing = []
+        pipeline = [
+            {"$group": {"_id": f"${ref_field}"}},
+            {"$lookup": {"from": collection_name, "localField": "_id", "foreignField": "id", "as": "source"}},
+            {"$match": {"source": {"$size": 0}}},
+            {"$project": {"_id": 1}},
+        ]
+        async with await sessions.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size) as cursor:
+            async for group in cursor:
+                missing.append(group["_id"])
+                if len(missing) >= batch_size:
+                    orphaned += await clear_orphans(sessions, kind, ref_field, missing)
+                    missing = []
+        if missing:
+            orphaned += await clear_orphans(sessions, kind, ref_field, missing)
+
+        summary[kind] = {"refreshed": refreshed, "orphaned": orphaned}
+
+    return summary
+
+
+async def main(command, batch_size):
+    load_dotenv()
+    client = AsyncMongoClient(os.getenv("MONGO_URI"), tz_aware=True, tzinfo=timezone.utc)
+    db = client[os.getenv("DB_NAME")]
+    try:
+        if command == "reconcile":
+            print(await reconcile(db, batch_size))
+        else:
+            worker = OutboxWorker(db, batch_size)
+            applied = await worker.drain()
+            await worker.release_lease()
+            print({"applied": applied})
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep embedded user/instructor copies in sessions up to date.")
+    parser.add_argument("command", choices=["reconcile", "drain"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.command, args.batch_size))
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import re
+from datetime import datetime
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library encoder
+    orjson = None
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+# Encode Mongo documents (plain dicts, lists, datetimes) straight to bytes, skipping
+# FastAPI's jsonable_encoder walk
+def dumps(content):
+    if orjson is not None:
+        return orjson.dumps(content, default=json_default)
+    return json.dumps(content, default=json_default, separators=(",", ":")).encode()
+
+
+def json_response(content, status_code=200):
+    return Response(dumps(content), status_code=status_code, media_type="application/json")
+
+
+# Detail responses carry an ETag; a matching If-None-Match gets a bodyless 304
+def conditional_json_response(request, content, headers=None):
+    body = dumps(content)
+    headers = {**(headers or {}), "ETag": '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+FIELD_PATTERN = re.compile(r"^[A-Za-z_]\w*(\.[A-Za-z_]\w*)*$")
+
+
+# Parse ?fields=id,topic,user.username into a list of field paths. Returns None when no
+# projection was asked for (including an empty ?fields=) and raises ValueError for names
+# Mongo should not see.
+def parse_fields(fields):
+    if fields is None:
+        return None
+    paths = [f.strip() for f in fields.split(",") if f.strip()]
+    if not paths:
+        return None
+    for path in paths:
+        # _id is Mongo's internal ObjectId, which every route keeps out of its responses
+        if not FIELD_PATTERN.match(path) or path.split(".")[0] == "_id":
+            raise ValueError(f"Invalid field {path!r}.")
+    # Drop paths already covered by a parent ("user" covers "user.username") to avoid path collisions
+    paths = set(paths)
+    return sorted(p for p in paths if not any(p.startswith(parent + ".") for parent in paths))
+
+
+def projection(paths, always=()):
+    if paths is None:
+        return {"_id": 0}
+    spec = {"_id": 0}
+    for path in [*paths, *always]:
+        if not any(path.startswith(parent + ".") for parent in spec):
+            spec[path] = 1
+    return spec
+
+
+# Apply the same field selection in Python, for documents served from the lookup cache
+def project(doc, paths):
+    if paths is None:
+        return doc
+    result = {}
+    for path in paths:
+        head, _, rest = path.partition(".")
+        if head not in doc:
+            continue
+        if not rest:
+            result[head] = doc[head]
+        elif isinstance(doc[head], dict):
+            nested = project(doc[head], [rest])
+            if nested:
+                result.setdefault(head, {}).update(nested)
+    return result
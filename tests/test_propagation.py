@@ -0,0 +1,102 @@
+import asyncio
+import os
+
+import httpx
+import pymongo
+import pytest
+from dotenv import load_dotenv
+
+# These tests drive the app in-process against a real MongoDB (MONGO_URI) and use their own
+# database, which is emptied before each test
+load_dotenv()
+os.environ["DB_NAME"] = os.getenv("TEST_DB_NAME", "collections_test")
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+
+
+def mongo_available():
+    try:
+        pymongo.MongoClient(MONGO_URI, serverSelectionTimeoutMS=1000).admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        return False
+    return True
+
+
+pytestmark = pytest.mark.skipif(not mongo_available(), reason=f"MongoDB not reachable at {MONGO_URI}")
+
+import main  # noqa: E402  (reads DB_NAME at import time)
+from propagation import OutboxWorker  # noqa: E402
+
+
+# Holds back the reply of the first update_one until released, after the write has committed,
+# like a slow network round trip
+class DelayedFirstUpdate:
+    def __init__(self, collection):
+        self.collection = collection
+        self.written = asyncio.Event()
+        self.release = asyncio.Event()
+        self.delayed = False
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def update_one(self, *args, **kwargs):
+        result = await self.collection.update_one(*args, **kwargs)
+        if not self.delayed:
+            self.delayed = True
+            self.written.set()
+            await self.release.wait()
+        return result
+
+
+async def overlapping_puts(http):
+    await http.post("/users", json={"id": 1, "username": "original", "level": "beginner"})
+    await http.post("/instructors", json={"id": 1, "name": "teacher", "expertise": "math"})
+    await http.post("/sessions", json={"id": 1, "topic": "t", "date": "2024-01-01T10:00:00",
+                                       "user_id": 1, "instructor_id": 1})
+
+    # PUT A commits first but its reply is held back until PUT B has finished, so A's
+    # fan-out runs last
+    delayed = DelayedFirstUpdate(main.users_collection)
+    main.users_collection = delayed
+    try:
+        put_a = asyncio.create_task(http.put("/users/1", json={"id": 1, "username": "A", "level": "beginner"}))
+        await delayed.written.wait()
+        await http.put("/users/1", json={"id": 1, "username": "B", "level": "beginner"})
+        delayed.release.set()
+        await put_a
+    finally:
+        main.users_collection = delayed.collection
+
+
+async def run_app(check, outbox=False):
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        for name in ("users", "instructors", "sessions", "propagation_outbox", "propagation_locks"):
+            await main.db[name].delete_many({})
+        main.users_cache.clear()
+        worker = OutboxWorker(main.db) if outbox else None
+        previous, main.outbox_worker = main.outbox_worker, worker
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                await overlapping_puts(http)
+                if worker is not None:
+                    await worker.drain()
+                    await worker.release_lease()
+                await check()
+        finally:
+            main.outbox_worker = previous
+
+
+async def assert_latest_user_embedded():
+    user = await main.db["users"].find_one({"id": 1}, {"_id": 0})
+    session = await main.db["sessions"].find_one({"id": 1}, {"_id": 0})
+    assert user["username"] == "B"
+    assert session["user"] == user
+
+
+def test_overlapping_puts_embed_latest_user_inline():
+    asyncio.run(run_app(assert_latest_user_embedded))
+
+
+def test_overlapping_puts_embed_latest_user_outbox():
+    asyncio.run(run_app(assert_latest_user_embedded, outbox=True))